@@ -1,20 +1,87 @@
+import asyncio
 import aiosqlite
 import os
+from contextlib import asynccontextmanager
+
+from aiosqlitepool import SQLiteConnectionPool
 
 DB_PATH = os.environ.get("DB_PATH", "/home/ammarateya/email-tracker/data/tracker.db")
 
+# Reads go through the pool. SQLite only allows one writer at a time anyway,
+# so all writes share one connection behind a lock instead of contending
+# for the database lock from several connections.
+_pool: SQLiteConnectionPool | None = None
+_writer: aiosqlite.Connection | None = None
+_writer_lock: asyncio.Lock | None = None
+
 
-async def get_db() -> aiosqlite.Connection:
+async def connect() -> aiosqlite.Connection:
+    """Open a new configured connection. Used as the pool's connection factory."""
     db = await aiosqlite.connect(DB_PATH)
     db.row_factory = aiosqlite.Row
     await db.execute("PRAGMA journal_mode=WAL")
     await db.execute("PRAGMA foreign_keys=ON")
+    # Pragmas below are per-connection. synchronous=NORMAL is safe under WAL
+    # and skips the fsync on every commit (durable as of the next checkpoint).
+    await db.execute("PRAGMA synchronous=NORMAL")
+    await db.execute("PRAGMA temp_store=MEMORY")
+    await db.execute("PRAGMA cache_size=-64000")
+    await db.execute("PRAGMA mmap_size=268435456")
+    await db.execute("PRAGMA busy_timeout=5000")
     return db
 
 
+async def open_db():
+    global _pool, _writer, _writer_lock
+    _pool = SQLiteConnectionPool(connect)
+    _writer = await connect()
+    # Commits never checkpoint on their own; see checkpoint_wal()
+    await _writer.execute("PRAGMA wal_autocheckpoint=0")
+    _writer_lock = asyncio.Lock()
+
+
+async def close_db():
+    global _pool, _writer
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+    if _writer is not None:
+        await _writer.close()
+        _writer = None
+
+
+def get_db():
+    """Borrow a pooled connection for reads: ``async with get_db() as db: ...``"""
+    return _pool.connection()
+
+
+@asynccontextmanager
+async def get_writer():
+    """Hold the writer connection: ``async with get_writer() as db: ...``
+
+    Uncommitted changes are rolled back if the block raises.
+    """
+    async with _writer_lock:
+        try:
+            yield _writer
+        except BaseException:
+            await _writer.rollback()
+            raise
+
+
+async def checkpoint_wal():
+    """Copy committed WAL pages back into the database file.
+
+    Runs on a pooled connection so it doesn't hold up the writer; PASSIVE
+    mode never blocks readers or writers either.
+    """
+    async with get_db() as db:
+        await db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+
 async def init_db():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    db = await get_db()
+    db = await connect()
     await db.executescript("""
         CREATE TABLE IF NOT EXISTS emails (
             id TEXT PRIMARY KEY,
@@ -46,7 +113,10 @@ async def init_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
 
-        CREATE INDEX IF NOT EXISTS idx_events_email_id ON events(email_id);
+        -- (email_id, event_type, ip) also serves lookups on just email_id or
+        -- (email_id, event_type), so the old single-column index is dropped.
+        DROP INDEX IF EXISTS idx_events_email_id;
+        CREATE INDEX IF NOT EXISTS idx_events_email_type_ip ON events(email_id, event_type, ip);
         CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp);
         CREATE INDEX IF NOT EXISTS idx_links_email_id ON links(email_id);
     """)
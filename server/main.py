@@ -1,58 +1,278 @@
+import asyncio
 import base64
+import logging
+import re
+import time
 import uuid
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime, timezone
 
 import httpx
 from fastapi import FastAPI, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, RedirectResponse, Response, JSONResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
 
-from database import get_db, init_db
+from database import checkpoint_wal, close_db, get_db, get_writer, init_db, open_db
 
-# 1x1 transparent PNG (68 bytes)
+logger = logging.getLogger(__name__)
+
+# 1x1 transparent PNG (69 bytes)
 PIXEL_PNG = base64.b64decode(
     "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR4"
     "nGNgYPgPAAEDAQAIicLsAAAABJRU5ErkJggg=="
 )
+PIXEL_HEADERS = [
+    (b"content-type", b"image/png"),
+    (b"content-length", str(len(PIXEL_PNG)).encode()),
+    (b"cache-control", b"no-store, no-cache, must-revalidate, max-age=0"),
+    (b"pragma", b"no-cache"),
+    (b"expires", b"0"),
+]
+
+
+class PixelResponse(Response):
+    """Tracking pixel response with headers encoded once at import time."""
+
+    def __init__(self):
+        self.status_code = 200
+        self.background = None
+        self.body = PIXEL_PNG
+        # Copied because middleware (e.g. CORS) may append to the list
+        self.raw_headers = PIXEL_HEADERS.copy()
+
+# Shared client for geolocation lookups; created and closed in lifespan
+HTTP_CLIENT: httpx.AsyncClient | None = None
+
+# ip -> (looked up at, location). Bounded; oldest entries are evicted first.
+GEO_CACHE_TTL = 86400
+GEO_CACHE_SIZE = 10000
+_geo_cache: dict[str, tuple[float, str]] = {}
+# In-flight lookups, so concurrent events from one IP share a single request
+_geo_inflight: dict[str, asyncio.Task] = {}
+
+
+async def _lookup_ip(ip: str) -> str | None:
+    """Query ip-api.com. Returns None if the lookup failed."""
+    try:
+        resp = await HTTP_CLIENT.get(f"http://ip-api.com/json/{ip}?fields=country,city")
+        if resp.status_code == 200:
+            data = resp.json()
+            city = data.get("city", "")
+            country = data.get("country", "")
+            if city and country:
+                return f"{city}, {country}"
+            return country or ""
+    except Exception:
+        pass
+    return None
 
 
-async def geolocate_ip(ip: str) -> str:
-    """Best-effort IP geolocation using free ip-api.com."""
+async def _lookup_and_cache(ip: str) -> str:
+    location = await _lookup_ip(ip)
+    if location is None:
+        # Don't cache failures (timeouts, rate limiting); retry next time
+        return ""
+    _geo_cache.pop(ip, None)
+    if len(_geo_cache) >= GEO_CACHE_SIZE:
+        del _geo_cache[next(iter(_geo_cache))]
+    _geo_cache[ip] = (time.monotonic(), location)
+    return location
+
+
+def cached_location(ip: str) -> str | None:
+    """Location for ip if known without a lookup, else None."""
     if not ip or ip in ("127.0.0.1", "::1", "testclient"):
         return ""
-    try:
-        async with httpx.AsyncClient(timeout=2.0) as client:
-            resp = await client.get(f"http://ip-api.com/json/{ip}?fields=country,city")
-            if resp.status_code == 200:
-                data = resp.json()
-                city = data.get("city", "")
-                country = data.get("country", "")
-                if city and country:
-                    return f"{city}, {country}"
-                return country or ""
-    except Exception:
-        pass
-    return ""
+    cached = _geo_cache.get(ip)
+    if cached and time.monotonic() - cached[0] < GEO_CACHE_TTL:
+        return cached[1]
+    return None
+
+
+async def geolocate_ip(ip: str) -> str:
+    """Best-effort IP geolocation using free ip-api.com, cached per IP."""
+    location = cached_location(ip)
+    if location is not None:
+        return location
+
+    task = _geo_inflight.get(ip)
+    if task is None:
+        task = asyncio.create_task(_lookup_and_cache(ip))
+        _geo_inflight[ip] = task
+        task.add_done_callback(lambda _: _geo_inflight.pop(ip, None))
+    # Shield so one cancelled caller doesn't cancel the lookup for the others
+    return await asyncio.shield(task)
+
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected
+_background_tasks: set[asyncio.Task] = set()
+
+
+def spawn(coro) -> asyncio.Task:
+    """Run a coroutine in the background, off the request's critical path."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+# Tracking events waiting to be written, as tuples of
+# (email_id, link_id, event_type, timestamp, ip, user_agent, country).
+# A single writer task drains the queue and commits them in batches, so the
+# WAL is synced once per batch rather than once per pixel load. Created in lifespan.
+EVENT_QUEUE: asyncio.Queue | None = None
+EVENT_BATCH_SIZE = 100
+EVENT_FLUSH_INTERVAL = 0.05
+
+# Hot-path SQL. sqlite3 keeps compiled statements in a per-connection cache
+# keyed by SQL text, so on the long-lived pool and writer connections these
+# are parsed once and reused.
+# Both inserts also skip ignored IPs (your own devices), covering an IP that
+# was ignored while its event sat in the queue.
+SQL_INSERT_EMAIL_STUB = (
+    "INSERT OR IGNORE INTO emails (id, subject, recipient) SELECT ?, '', '' "
+    "WHERE NOT EXISTS (SELECT 1 FROM ignored_ips WHERE ip = ?)"
+)
+SQL_INSERT_EVENT = (
+    "INSERT INTO events (email_id, link_id, event_type, timestamp, ip, user_agent, country) "
+    "SELECT ?, ?, ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM emails WHERE id = ?) "
+    "AND NOT EXISTS (SELECT 1 FROM ignored_ips WHERE ip = ?)"
+)
+SQL_GET_LINK = "SELECT email_id, original_url FROM links WHERE id = ?"
+
+# Mirror of the ignored_ips table, so tracking hits from your own devices are
+# dropped without touching SQLite. Loaded in lifespan and updated alongside
+# every write to the table.
+IGNORED_IPS: set[str] = set()
+
+
+async def _geolocate_and_queue(event: tuple):
+    country = await geolocate_ip(event[4])
+    EVENT_QUEUE.put_nowait(event + (country,))
+
+
+def record_event(
+    email_id: str, link_id: str | None, event_type: str, ip: str, user_agent: str
+):
+    """Queue a tracking event for the writer without waiting on any I/O."""
+    # Stamp the event now; geolocation and batching delay the actual INSERT
+    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    event = (email_id, link_id, event_type, timestamp, ip, user_agent)
+    country = cached_location(ip)
+    if country is None:
+        spawn(_geolocate_and_queue(event))
+    else:
+        EVENT_QUEUE.put_nowait(event + (country,))
+
+
+async def _write_events(batch: list[tuple]):
+    async with get_writer() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        # Create email records that don't exist yet (pixel may load before registration)
+        await db.executemany(
+            SQL_INSERT_EMAIL_STUB, [(e[0], e[4]) for e in batch if e[2] == "open"]
+        )
+        # Skip clicks whose email was deleted while the event was queued
+        await db.executemany(SQL_INSERT_EVENT, [e + (e[0], e[4]) for e in batch])
+        await db.commit()
+
+
+async def _event_writer():
+    """Drain EVENT_QUEUE in batches until a None sentinel is received."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await EVENT_QUEUE.get()]
+        deadline = loop.time() + EVENT_FLUSH_INTERVAL
+        while len(batch) < EVENT_BATCH_SIZE and batch[-1] is not None:
+            try:
+                batch.append(
+                    await asyncio.wait_for(EVENT_QUEUE.get(), deadline - loop.time())
+                )
+            except asyncio.TimeoutError:
+                break
+
+        stop = batch[-1] is None
+        if stop:
+            batch.pop()
+        if batch:
+            try:
+                await _write_events(batch)
+            except Exception:
+                logger.exception("Failed to write %d tracking events", len(batch))
+        if stop:
+            return
+
+
+# Checkpointing is done here rather than by SQLite's auto-checkpoint, which
+# would otherwise stall whichever event batch commit crosses the threshold.
+WAL_CHECKPOINT_INTERVAL = 30
+
+
+async def _wal_checkpointer():
+    while True:
+        await asyncio.sleep(WAL_CHECKPOINT_INTERVAL)
+        try:
+            await checkpoint_wal()
+        except Exception:
+            logger.exception("WAL checkpoint failed")
+
+
+# Link expanders and crawlers that fetch pixels/links without a human
+# reading the email (LinkedInBot, Slackbot-LinkExpanding, Twitterbot, ...).
+# Mail image proxies such as Gmail's GoogleImageProxy are real opens and
+# deliberately don't match. One compiled alternation scans the UA once.
+PREFETCHER_UA = re.compile(
+    r"bot\b|crawler|spider|preview|facebookexternalhit|embedly", re.IGNORECASE
+)
 
 
 def client_ip(request: Request) -> str:
     """Extract client IP, respecting CF and proxy headers."""
-    return (
-        request.headers.get("cf-connecting-ip")
-        or request.headers.get("x-forwarded-for", "").split(",")[0].strip()
-        or (request.client.host if request.client else "")
-    )
+    headers = request.headers
+    ip = headers.get("cf-connecting-ip")
+    if ip:
+        return ip
+    xff = headers.get("x-forwarded-for")
+    if xff:
+        # Only the first (client) address matters; avoid splitting the whole list
+        comma = xff.find(",")
+        ip = (xff[:comma] if comma >= 0 else xff).strip()
+        if ip:
+            return ip
+    return request.client.host if request.client else ""
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global HTTP_CLIENT, EVENT_QUEUE
     await init_db()
+    await open_db()
+    async with get_db() as db:
+        rows = await db.execute_fetchall("SELECT ip FROM ignored_ips")
+    IGNORED_IPS.clear()
+    IGNORED_IPS.update(r["ip"] for r in rows)
+    HTTP_CLIENT = httpx.AsyncClient(
+        timeout=2.0, limits=httpx.Limits(max_keepalive_connections=20)
+    )
+    EVENT_QUEUE = asyncio.Queue()
+    writer = asyncio.create_task(_event_writer())
+    checkpointer = asyncio.create_task(_wal_checkpointer())
     yield
+    checkpointer.cancel()
+    with suppress(asyncio.CancelledError):
+        await checkpointer
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+    # Flush whatever is still queued before shutting down
+    EVENT_QUEUE.put_nowait(None)
+    await writer
+    await HTTP_CLIENT.aclose()
+    await close_db()
 
 
-app = FastAPI(lifespan=lifespan)
+# orjson serializes the /api payloads much faster than the stdlib json module
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -69,76 +289,32 @@ app.add_middleware(
 @app.get("/t/{tracking_id}.png")
 async def track_open(tracking_id: str, request: Request):
     """Serve tracking pixel and log open event."""
-    db = await get_db()
-    try:
-        ip = client_ip(request)
+    ip = client_ip(request)
+    ua = request.headers.get("user-agent", "")
 
-        # Skip ignored IPs (your own devices)
-        ignored = await db.execute_fetchall(
-            "SELECT ip FROM ignored_ips WHERE ip = ?", (ip,)
-        )
-        if ignored:
-            return Response(
-                content=PIXEL_PNG,
-                media_type="image/png",
-                headers={"Cache-Control": "no-store, no-cache, must-revalidate, max-age=0"},
-            )
+    # Skip ignored IPs (your own devices) and link-preview bots
+    if ip not in IGNORED_IPS and not PREFETCHER_UA.search(ua):
+        # The event is written in the background; don't make the mail client wait
+        record_event(tracking_id, None, "open", ip, ua)
 
-        # Create email record if it doesn't exist yet (pixel may load before registration)
-        await db.execute(
-            "INSERT OR IGNORE INTO emails (id, subject, recipient) VALUES (?, '', '')",
-            (tracking_id,),
-        )
-        country = await geolocate_ip(ip)
-        await db.execute(
-            "INSERT INTO events (email_id, event_type, ip, user_agent, country) VALUES (?, 'open', ?, ?, ?)",
-            (tracking_id, ip, request.headers.get("user-agent", ""), country),
-        )
-        await db.commit()
-    finally:
-        await db.close()
-
-    return Response(
-        content=PIXEL_PNG,
-        media_type="image/png",
-        headers={
-            "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-            "Pragma": "no-cache",
-            "Expires": "0",
-        },
-    )
+    return PixelResponse()
 
 
 @app.get("/c/{link_id}")
 async def track_click(link_id: str, request: Request):
     """Log click event and redirect to original URL."""
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall(
-            "SELECT email_id, original_url FROM links WHERE id = ?", (link_id,)
-        )
+    async with get_db() as db:
+        rows = await db.execute_fetchall(SQL_GET_LINK, (link_id,))
         if not rows:
-            return JSONResponse({"error": "Link not found"}, status_code=404)
-
-        link = rows[0]
-        ip = client_ip(request)
+            return ORJSONResponse({"error": "Link not found"}, status_code=404)
 
-        # Skip ignored IPs (your own devices)
-        ignored = await db.execute_fetchall(
-            "SELECT ip FROM ignored_ips WHERE ip = ?", (ip,)
-        )
-        if not ignored:
-            country = await geolocate_ip(ip)
-            await db.execute(
-                "INSERT INTO events (email_id, link_id, event_type, ip, user_agent, country) VALUES (?, ?, 'click', ?, ?, ?)",
-                (link["email_id"], link_id, ip, request.headers.get("user-agent", ""), country),
-            )
-            await db.commit()
-        redirect_url = link["original_url"]
-    finally:
-        await db.close()
+    link = rows[0]
+    ip = client_ip(request)
+    ua = request.headers.get("user-agent", "")
+    if ip not in IGNORED_IPS and not PREFETCHER_UA.search(ua):
+        record_event(link["email_id"], link_id, "click", ip, ua)
 
-    return RedirectResponse(url=redirect_url, status_code=302)
+    return RedirectResponse(url=link["original_url"], status_code=302)
 
 
 # ---------------------------------------------------------------------------
@@ -155,8 +331,7 @@ async def create_email(request: Request):
     recipient = body.get("recipient", "")
     link_urls = body.get("links", [])
 
-    db = await get_db()
-    try:
+    async with get_writer() as db:
         await db.execute(
             "INSERT INTO emails (id, subject, recipient) VALUES (?, ?, ?) "
             "ON CONFLICT(id) DO UPDATE SET subject=excluded.subject, recipient=excluded.recipient "
@@ -164,23 +339,19 @@ async def create_email(request: Request):
             (email_id, subject, recipient),
         )
 
-        link_mappings = []
-        for url in link_urls:
-            link_id = uuid.uuid4().hex[:10]
-            await db.execute(
-                "INSERT INTO links (id, email_id, original_url) VALUES (?, ?, ?)",
-                (link_id, email_id, url),
-            )
-            link_mappings.append({"original_url": url, "tracked_url": f"/c/{link_id}"})
+        links = [(uuid.uuid4().hex[:10], email_id, url) for url in link_urls]
+        await db.executemany(
+            "INSERT INTO links (id, email_id, original_url) VALUES (?, ?, ?)", links
+        )
 
         await db.commit()
-    finally:
-        await db.close()
 
     return {
         "email_id": email_id,
         "pixel_url": f"/t/{email_id}.png",
-        "links": link_mappings,
+        "links": [
+            {"original_url": url, "tracked_url": f"/c/{link_id}"} for link_id, _, url in links
+        ],
     }
 
 
@@ -191,8 +362,7 @@ async def list_emails(
     search: str = Query("", alias="q"),
 ):
     """List tracked emails with open/click counts."""
-    db = await get_db()
-    try:
+    async with get_db() as db:
         offset = (page - 1) * per_page
 
         where = ""
@@ -201,18 +371,16 @@ async def list_emails(
             where = "WHERE e.subject LIKE ? OR e.recipient LIKE ?"
             params = [f"%{search}%", f"%{search}%"]
 
-        count_row = await db.execute_fetchall(
-            f"SELECT COUNT(*) as total FROM emails e {where}", params
-        )
-        total = count_row[0]["total"]
-
+        # COUNT(*) OVER () counts the grouped rows before LIMIT/OFFSET, so
+        # every row on the page carries the total number of matching emails
         rows = await db.execute_fetchall(
             f"""
             SELECT
                 e.id, e.subject, e.recipient, e.created_at,
                 COALESCE(SUM(CASE WHEN ev.event_type = 'open' AND ii.ip IS NULL THEN 1 ELSE 0 END), 0) as open_count,
                 COALESCE(SUM(CASE WHEN ev.event_type = 'click' AND ii.ip IS NULL THEN 1 ELSE 0 END), 0) as click_count,
-                MAX(CASE WHEN ev.event_type = 'open' AND ii.ip IS NULL THEN ev.timestamp END) as last_opened
+                MAX(CASE WHEN ev.event_type = 'open' AND ii.ip IS NULL THEN ev.timestamp END) as last_opened,
+                COUNT(*) OVER () as _total
             FROM emails e
             LEFT JOIN events ev ON ev.email_id = e.id
             LEFT JOIN ignored_ips ii ON ii.ip = ev.ip
@@ -224,9 +392,20 @@ async def list_emails(
             params + [per_page, offset],
         )
 
+        if rows:
+            total = rows[0]["_total"]
+        elif offset:
+            # Past the last page there's no row to read the total from
+            count_row = await db.execute_fetchall(
+                f"SELECT COUNT(*) as total FROM emails e {where}", params
+            )
+            total = count_row[0]["total"]
+        else:
+            total = 0
+
         emails = [dict(r) for r in rows]
-    finally:
-        await db.close()
+        for e in emails:
+            del e["_total"]
 
     return {"emails": emails, "total": total, "page": page, "per_page": per_page}
 
@@ -234,13 +413,12 @@ async def list_emails(
 @app.get("/api/emails/{email_id}")
 async def get_email(email_id: str):
     """Get email detail with events and link breakdown."""
-    db = await get_db()
-    try:
+    async with get_db() as db:
         rows = await db.execute_fetchall(
             "SELECT * FROM emails WHERE id = ?", (email_id,)
         )
         if not rows:
-            return JSONResponse({"error": "Not found"}, status_code=404)
+            return ORJSONResponse({"error": "Not found"}, status_code=404)
 
         email = dict(rows[0])
 
@@ -256,44 +434,22 @@ async def get_email(email_id: str):
         )
         email["events"] = [dict(e) for e in events]
 
-        # Unique opens by IP (excluding ignored IPs)
-        unique_opens = await db.execute_fetchall(
-            """
-            SELECT COUNT(DISTINCT ev.ip) as count 
-            FROM events ev 
-            WHERE ev.email_id = ? AND ev.event_type = 'open'
-            AND ev.ip NOT IN (SELECT ip FROM ignored_ips)
-            """,
-            (email_id,),
-        )
-        email["unique_opens"] = unique_opens[0]["count"]
-
-        # Total counts (excluding ignored IPs for opens)
+        # Open/click totals in a single pass over the email's events.
+        # Ignored IPs are excluded, but their opens are counted for reference.
         counts = await db.execute_fetchall(
             """
             SELECT
+                COUNT(DISTINCT CASE WHEN ev.event_type = 'open' AND ii.ip IS NULL THEN ev.ip END) as unique_opens,
                 COALESCE(SUM(CASE WHEN ev.event_type = 'open' AND ii.ip IS NULL THEN 1 ELSE 0 END), 0) as total_opens,
-                COALESCE(SUM(CASE WHEN ev.event_type = 'click' AND ii.ip IS NULL THEN 1 ELSE 0 END), 0) as total_clicks
+                COALESCE(SUM(CASE WHEN ev.event_type = 'click' AND ii.ip IS NULL THEN 1 ELSE 0 END), 0) as total_clicks,
+                COALESCE(SUM(CASE WHEN ev.event_type = 'open' AND ii.ip IS NOT NULL THEN 1 ELSE 0 END), 0) as ignored_opens
             FROM events ev
             LEFT JOIN ignored_ips ii ON ii.ip = ev.ip
             WHERE ev.email_id = ?
             """,
             (email_id,),
         )
-        email["total_opens"] = counts[0]["total_opens"]
-        email["total_clicks"] = counts[0]["total_clicks"]
-        
-        # Also add count of ignored opens for reference
-        ignored_counts = await db.execute_fetchall(
-            """
-            SELECT COUNT(*) as count 
-            FROM events ev
-            JOIN ignored_ips ii ON ii.ip = ev.ip
-            WHERE ev.email_id = ? AND ev.event_type = 'open'
-            """,
-            (email_id,),
-        )
-        email["ignored_opens"] = ignored_counts[0]["count"]
+        email.update(counts[0])
 
         # Link breakdown
         link_stats = await db.execute_fetchall(
@@ -307,8 +463,6 @@ async def get_email(email_id: str):
             (email_id,),
         )
         email["link_stats"] = [dict(ls) for ls in link_stats]
-    finally:
-        await db.close()
 
     return email
 
@@ -316,20 +470,16 @@ async def get_email(email_id: str):
 @app.delete("/api/emails/{email_id}")
 async def delete_email(email_id: str):
     """Delete a tracked email and all its events."""
-    db = await get_db()
-    try:
+    async with get_writer() as db:
         await db.execute("DELETE FROM emails WHERE id = ?", (email_id,))
         await db.commit()
-    finally:
-        await db.close()
     return {"ok": True}
 
 
 @app.get("/api/stats")
 async def get_stats():
     """Aggregate stats for the overview page."""
-    db = await get_db()
-    try:
+    async with get_db() as db:
         totals = await db.execute_fetchall("""
             SELECT
                 (SELECT COUNT(*) FROM emails) as total_emails,
@@ -360,8 +510,6 @@ async def get_stats():
             ORDER BY date
         """)
         t["activity"] = [dict(a) for a in activity]
-    finally:
-        await db.close()
 
     return t
 
@@ -373,12 +521,9 @@ async def get_stats():
 
 @app.get("/api/ignored-ips")
 async def list_ignored_ips():
-    db = await get_db()
-    try:
+    async with get_db() as db:
         rows = await db.execute_fetchall("SELECT * FROM ignored_ips ORDER BY created_at DESC")
         return [dict(r) for r in rows]
-    finally:
-        await db.close()
 
 
 @app.post("/api/ignored-ips")
@@ -387,25 +532,21 @@ async def add_ignored_ip(request: Request):
     body = await request.json()
     ip = body.get("ip") or client_ip(request)
     label = body.get("label", "")
-    db = await get_db()
-    try:
+    async with get_writer() as db:
         await db.execute(
             "INSERT OR IGNORE INTO ignored_ips (ip, label) VALUES (?, ?)", (ip, label)
         )
         await db.commit()
-    finally:
-        await db.close()
+    IGNORED_IPS.add(ip)
     return {"ok": True, "ip": ip}
 
 
 @app.delete("/api/ignored-ips/{ip}")
 async def remove_ignored_ip(ip: str):
-    db = await get_db()
-    try:
+    async with get_writer() as db:
         await db.execute("DELETE FROM ignored_ips WHERE ip = ?", (ip,))
         await db.commit()
-    finally:
-        await db.close()
+    IGNORED_IPS.discard(ip)
     return {"ok": True}
 
 
@@ -418,20 +559,25 @@ async def my_ip(request: Request):
 # Serve dashboard — static assets under /static, index.html at root
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# Read once; restart the server to pick up changes to the dashboard
+with open("static/index.html", "rb") as f:
+    DASHBOARD_HTML = f.read()
+
+
+async def _auto_ignore_ip(ip: str):
+    async with get_writer() as db:
+        await db.execute(
+            "INSERT OR IGNORE INTO ignored_ips (ip, label) VALUES (?, ?)",
+            (ip, "Auto-detected (dashboard visit)"),
+        )
+        await db.commit()
+
 
 @app.get("/", response_class=HTMLResponse)
 async def dashboard(request: Request):
     """Serve dashboard and auto-ignore the viewer's IP."""
     ip = client_ip(request)
-    if ip and ip not in ("127.0.0.1", "::1"):
-        db = await get_db()
-        try:
-            await db.execute(
-                "INSERT OR IGNORE INTO ignored_ips (ip, label) VALUES (?, ?)",
-                (ip, "Auto-detected (dashboard visit)"),
-            )
-            await db.commit()
-        finally:
-            await db.close()
-    with open("static/index.html") as f:
-        return f.read()
+    if ip and ip not in ("127.0.0.1", "::1") and ip not in IGNORED_IPS:
+        IGNORED_IPS.add(ip)
+        spawn(_auto_ignore_ip(ip))
+    return HTMLResponse(DASHBOARD_HTML)